@@ -8,11 +8,15 @@
 """
 
 import os
+import math
 import pandas as pd
 import numpy as np
+import orjson
 import plotly.graph_objects as go
-from dash import Dash, dcc, html, dash_table
-from plotly.subplots import make_subplots
+import plotly.io as pio
+from dash import Dash, html, Input, Output
+
+from dash_common import cache_path, write_atomic
 
 
 # ==============================================================================
@@ -49,15 +53,38 @@ class DataManager:
         if not os.path.exists(self.file_path):
             raise FileNotFoundError(f"数据文件未找到: {self.file_path}")
 
-        df = pd.read_csv(self.file_path)
+        # pyarrow解析 + 显式类型：数值列float32，物种列category
+        df = pd.read_csv(
+            self.file_path,
+            engine='pyarrow',
+            dtype={
+                'SepalLength': 'float32',
+                'SepalWidth': 'float32',
+                'PetalLength': 'float32',
+                'PetalWidth': 'float32',
+                'Name': 'category'
+            }
+        )
         required_cols = ['SepalLength', 'SepalWidth', 'PetalLength', 'PetalWidth', 'Name']
-        if not all(col in df.columns for col in required_cols):
+        if set(required_cols) - set(df.columns):
             raise ValueError("数据集缺少必需列")
 
         df.columns = [c.replace('Iris-', '') if 'Iris' in c else c for c in df.columns]
         return df
 
 
+def corr_and_max(X):
+    """一次标准化 + 一次矩阵乘法，同时返回相关矩阵与非对角线最大绝对相关性"""
+    X = np.asarray(X, dtype=np.float64)
+    Z = X - X.mean(axis=0)
+    Z /= np.sqrt((Z * Z).sum(axis=0))
+    corr = Z.T @ Z
+
+    off_diag = np.abs(corr)
+    np.fill_diagonal(off_diag, 0.0)
+    return corr, off_diag.max()
+
+
 # ==============================================================================
 # 3. 图表架构师
 # ==============================================================================
@@ -72,84 +99,48 @@ class ChartArchitect:
             'PetalWidth': '花瓣宽度'
         }
 
+        # 按物种预分组，构建图表时直接取用NumPy数组
+        self._species_arrays = {
+            name: {dim: sub[dim].to_numpy() for dim in self.dimensions}
+            for name, sub in df.groupby('Name', sort=False, observed=True)
+        }
+
     def build_scatter_matrix(self):
         """构建4x4散点图矩阵（SPLOM）"""
-        corr = self.df[self.dimensions].corr().abs()
-        np.fill_diagonal(corr.values, 0)
-        max_corr = corr.max().max()
+        _, max_corr = corr_and_max(self.df[self.dimensions].to_numpy(copy=False))
 
         n_dims = len(self.dimensions)
-        fig = make_subplots(
-            rows=n_dims,
-            cols=n_dims,
-            subplot_titles=[f"{self.dim_labels[self.dimensions[i]]} vs {self.dim_labels[self.dimensions[j]]}"
-                            if i != j else f"{self.dim_labels[self.dimensions[i]]} 分布"
-                            for i in range(n_dims) for j in range(n_dims)],
-            vertical_spacing=0.05,
-            horizontal_spacing=0.05
-        )
-
-        species = self.df['Name'].unique()
-
-        for i, dim_y in enumerate(self.dimensions):
-            for j, dim_x in enumerate(self.dimensions):
-                row = i + 1
-                col = j + 1
-
-                if i == j:
-                    # 对角线：直方图
-                    for spec in species:
-                        df_spec = self.df[self.df['Name'] == spec]
-                        fig.add_trace(
-                            go.Histogram(
-                                x=df_spec[dim_x],
-                                name=spec,
-                                marker_color=VisualConfig.COLOR_MAP.get(spec, "#666666"),
-                                opacity=0.7,
-                                showlegend=(i == 0 and j == 0),
-                                legendgroup=spec
-                            ),
-                            row=row, col=col
-                        )
-                else:
-                    # 非对角线：散点图
-                    for spec in species:
-                        df_spec = self.df[self.df['Name'] == spec]
-                        fig.add_trace(
-                            go.Scatter(
-                                x=df_spec[dim_x],
-                                y=df_spec[dim_y],
-                                mode='markers',
-                                name=spec,
-                                marker=dict(
-                                    color=VisualConfig.COLOR_MAP.get(spec, "#666666"),
-                                    size=6,
-                                    opacity=0.7
-                                ),
-                                showlegend=(i == 0 and j == 1),
-                                legendgroup=spec
-                            ),
-                            row=row, col=col
-                        )
-
-                fig.update_xaxes(
-                    title_text=self.dim_labels[dim_x] if i == n_dims - 1 else "",
-                    showgrid=True,
-                    gridwidth=1,
-                    gridcolor="#F0F0F0",
-                    linecolor="#333333",
-                    tickfont=dict(family=VisualConfig.FONTS["code"], size=9),
-                    row=row, col=col
-                )
-                fig.update_yaxes(
-                    title_text=self.dim_labels[dim_y] if j == 0 else "",
-                    showgrid=True,
-                    gridwidth=1,
-                    gridcolor="#F0F0F0",
-                    linecolor="#333333",
-                    tickfont=dict(family=VisualConfig.FONTS["code"], size=9),
-                    row=row, col=col
+        labels = [self.dim_labels[d] for d in self.dimensions]
+
+        # 使用专用的Splom轨迹（WebGL）：每个物种一条，保留图例与悬停信息
+        fig = go.Figure()
+        for spec, arrays in self._species_arrays.items():
+            fig.add_trace(
+                go.Splom(
+                    dimensions=[dict(label=label, values=arrays[dim])
+                                for dim, label in zip(self.dimensions, labels)],
+                    name=spec,
+                    marker=dict(
+                        color=VisualConfig.COLOR_MAP.get(spec, "#666666"),
+                        size=6,
+                        opacity=0.7,
+                        line=dict(width=0)
+                    ),
+                    diagonal=dict(visible=True),
+                    showupperhalf=True
                 )
+            )
+
+        # Splom的坐标轴依次为 xaxis, xaxis2, ... / yaxis, yaxis2, ...
+        tickfont = dict(family=VisualConfig.FONTS["code"], size=9)
+        axis_style = dict(showgrid=True, gridwidth=1, gridcolor="#F0F0F0", linecolor="#333333", tickfont=tickfont)
+        axis_updates = {}
+        for k in range(1, n_dims + 1):
+            axis_id = "" if k == 1 else str(k)
+            axis_updates[f"xaxis{axis_id}"] = axis_style
+            axis_updates[f"yaxis{axis_id}"] = axis_style
+
+        fig.update_layout(**axis_updates)
 
         fig.update_layout(
             title=dict(
@@ -178,10 +169,85 @@ class ChartArchitect:
 # ==============================================================================
 # 4. Dash应用构建
 # ==============================================================================
+TABLE_PAGE_SIZE = 10
+
+# DataTable 过滤表达式中的运算符（每组首项为规范名称）
+TABLE_FILTER_OPERATORS = [
+    ['ge ', '>='], ['le ', '<='], ['lt ', '<'], ['gt ', '>'],
+    ['ne ', '!='], ['eq ', '='], ['contains '], ['datestartswith ']
+]
+
+
+def _split_filter_part(filter_part):
+    """把 '{列名} 运算符 值' 形式的单个过滤条件拆分为 (列名, 运算符, 值)"""
+    for operator_type in TABLE_FILTER_OPERATORS:
+        for operator in operator_type:
+            if operator in filter_part:
+                name_part, value_part = filter_part.split(operator, 1)
+                name = name_part[name_part.find('{') + 1: name_part.rfind('}')]
+
+                value_part = value_part.strip()
+                v0 = value_part[0] if value_part else ''
+                if v0 and v0 == value_part[-1] and v0 in ("'", '"', '`'):
+                    value = value_part[1:-1].replace('\\' + v0, v0)
+                else:
+                    try:
+                        value = float(value_part)
+                    except ValueError:
+                        value = value_part
+
+                return name, operator_type[0].strip(), value
+
+    return None, None, None
+
+
+def query_table(df, filter_query, sort_by):
+    """在服务端执行DataTable的过滤与排序"""
+    for filter_part in filter_query.split(' && ') if filter_query else []:
+        col, operator, value = _split_filter_part(filter_part)
+        if col not in df.columns:
+            continue
+
+        if operator in ('eq', 'ne', 'lt', 'le', 'gt', 'ge'):
+            # 数值列按列自身精度比较，避免float32与float64比较时的误差
+            if pd.api.types.is_numeric_dtype(df[col]) and isinstance(value, float):
+                value = df[col].dtype.type(value)
+            try:
+                df = df.loc[getattr(df[col], operator)(value)]
+            except TypeError:
+                continue
+        elif operator == 'contains':
+            df = df.loc[df[col].astype(str).str.contains(str(value), regex=False)]
+        elif operator == 'datestartswith':
+            df = df.loc[df[col].astype(str).str.startswith(str(value))]
+
+    if sort_by:
+        df = df.sort_values(
+            [c['column_id'] for c in sort_by],
+            ascending=[c['direction'] == 'asc' for c in sort_by]
+        )
+    return df
+
+
 def create_dash_app(df, fig):
     """创建Dash应用实例"""
+    # 仅在构建布局时才需要，延迟导入以缩短Worker启动的导入路径
+    from dash import dash_table
+
     app = Dash(__name__)
 
+    # 图表静态化：启动时渲染一次HTML，由Flask路由直接返回，页面请求不再重复序列化图表
+    fig_html = pio.to_html(fig, include_plotlyjs='cdn', full_html=True, div_id='iris-splom')
+
+    @app.server.route('/iris_fig.html')
+    def iris_figure_page():
+        return fig_html
+
+    # 表格展示副本：数值列保留两位小数并降为float32，缩小传给浏览器的JSON
+    df_display = df.copy()
+    num_cols = df_display.select_dtypes('float').columns
+    df_display[num_cols] = df_display[num_cols].round(2).astype('float32')
+
     app.layout = html.Div(
         style={'backgroundColor': VisualConfig.DASH_BG, 'padding': '40px', 'fontFamily': VisualConfig.FONTS['ui']},
         children=[
@@ -190,16 +256,22 @@ def create_dash_app(df, fig):
             html.Hr(style={'borderColor': '#888888'}),
 
             html.Div([
-                dcc.Graph(figure=fig)
+                html.Iframe(src=app.get_relative_path('/iris_fig.html'),
+                            style={'width': '100%', 'height': '1020px', 'border': 'none'})
             ], style={'backgroundColor': '#FFFFFF', 'padding': '20px', 'boxShadow': '0 4px 6px rgba(0,0,0,0.1)',
                       'marginBottom': '30px'}),
 
             html.Div([
                 html.H3("原始数据检查（可排序 & 可过滤）", style={'fontFamily': VisualConfig.FONTS['title']}),
+                # 后端分页：初始布局不携带数据，由回调按页返回
                 dash_table.DataTable(
-                    data=df.to_dict('records'),
-                    columns=[{'name': i, 'id': i} for i in df.columns],
-                    page_size=10,
+                    id='iris-table',
+                    data=[],
+                    columns=[{'name': i, 'id': i} for i in df_display.columns],
+                    page_action='custom',
+                    page_current=0,
+                    page_size=TABLE_PAGE_SIZE,
+                    page_count=math.ceil(len(df_display) / TABLE_PAGE_SIZE),
                     style_table={'overflowX': 'auto'},
                     style_cell={
                         'fontFamily': VisualConfig.FONTS['code'],
@@ -214,12 +286,28 @@ def create_dash_app(df, fig):
                     style_data_conditional=[
                         {'if': {'row_index': 'odd'}, 'backgroundColor': 'rgb(248, 248, 248)'}
                     ],
-                    filter_action="native",
-                    sort_action="native"
+                    filter_action="custom",
+                    sort_action="custom",
+                    sort_mode="multi"
                 )
             ], style={'backgroundColor': '#FFFFFF', 'padding': '20px', 'boxShadow': '0 4px 6px rgba(0,0,0,0.1)'})
         ])
 
+    @app.callback(
+        [Output('iris-table', 'data'),
+         Output('iris-table', 'page_count')],
+        [Input('iris-table', 'page_current'),
+         Input('iris-table', 'page_size'),
+         Input('iris-table', 'sort_by'),
+         Input('iris-table', 'filter_query')]
+    )
+    def update_table(page_current, page_size, sort_by, filter_query):
+        result = query_table(df_display, filter_query, sort_by)
+        start = page_current * page_size
+        page = result.iloc[start:start + page_size]
+        return (orjson.loads(page.to_json(orient='records', double_precision=6)),
+                max(1, math.ceil(len(result) / page_size)))
+
     return app
 
 
@@ -231,8 +319,26 @@ def create_app():
     DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "iris.csv")
 
     manager = DataManager(DATA_PATH)
-    architect = ChartArchitect(manager.df)
-    figure = architect.build_scatter_matrix()
+
+    # 图表缓存：Worker冷启动时直接读取已序列化的图表，跳过完整构建流程
+    fig_path = cache_path("iris_fig", ".json", DATA_PATH, __file__)
+    figure = None
+    if os.path.exists(fig_path):
+        try:
+            with open(fig_path, encoding="utf-8") as f:
+                figure = pio.from_json(f.read())
+        except (OSError, ValueError):
+            # 缓存不可读或内容损坏时重新构建，不影响启动
+            figure = None
+    if figure is None:
+        architect = ChartArchitect(manager.df)
+        figure = architect.build_scatter_matrix()
+
+        def write_figure(path):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(figure.to_json())
+
+        write_atomic(fig_path, write_figure)
 
     app = create_dash_app(manager.df, figure)
     return app.server
@@ -241,6 +347,49 @@ def create_app():
 # Gunicorn使用此对象
 server = create_app()
 
+# ==============================================================================
+# 本地导出工具
+# ==============================================================================
+def start_export_engine():
+    """启动常驻Kaleido渲染进程，使多次write_image复用同一个Chromium；返回kaleido是否可用"""
+    try:
+        import kaleido
+    except ImportError:
+        return False
+
+    # kaleido 1.x 每次导出默认重启浏览器；0.2.x 本身即为常驻进程，无需处理
+    if hasattr(kaleido, "start_sync_server"):
+        # 先同步检查Chrome：缺失时后台会话线程会静默退出，导致后续导出永久阻塞
+        kaleido.Kaleido()
+        kaleido.start_sync_server(silence_warnings=True)
+    return True
+
+
+def export_assets(figs, export_dir):
+    """批量导出静态资源：先写全部HTML，再在同一个Kaleido会话中导出全部SVG"""
+    os.makedirs(export_dir, exist_ok=True)
+
+    for name, fig in figs.items():
+        html_path = os.path.join(export_dir, f"{name}.html")
+        fig.write_html(html_path)
+        print(f">>> [导出] HTML已生成: {html_path}")
+
+    # 尝试SVG（需要kaleido）
+    try:
+        if not start_export_engine():
+            raise ImportError("kaleido")
+        svg_paths = [os.path.join(export_dir, f"{name}.svg") for name in figs]
+        if hasattr(pio, "write_images"):
+            pio.write_images(list(figs.values()), svg_paths)
+        else:
+            for fig, svg_path in zip(figs.values(), svg_paths):
+                fig.write_image(svg_path)
+        for svg_path in svg_paths:
+            print(f">>> [导出] SVG已生成: {svg_path}")
+    except Exception:
+        print(">>> [跳过] SVG导出需要kaleido")
+
+
 # ==============================================================================
 # 本地开发入口（仅本地调试）
 # ==============================================================================
@@ -269,19 +418,7 @@ if __name__ == "__main__":
     # 本地专属：导出静态资源
     try:
         export_dir = os.path.join(os.getcwd(), "deliverables")
-        os.makedirs(export_dir, exist_ok=True)
-
-        html_path = os.path.join(export_dir, "iris_matrix.html")
-        figure.write_html(html_path)
-        print(f">>> [导出] HTML已生成: {html_path}")
-
-        # 尝试SVG（需要kaleido）
-        try:
-            svg_path = os.path.join(export_dir, "iris_matrix.svg")
-            figure.write_image(svg_path)
-            print(f">>> [导出] SVG已生成: {svg_path}")
-        except Exception:
-            print(">>> [跳过] SVG导出需要kaleido")
+        export_assets({"iris_matrix": figure}, export_dir)
     except Exception as e:
         print(f">>> [警告] 资源导出失败: {e}")
 
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+各仪表盘共用的工具：服务启动、本地缓存（路径、原子写入、Parquet 读取）与图表预序列化
+脚本与本模块放在同一目录即可直接 import
+"""
+
+import os
+import hashlib
+import tempfile
+
+import pandas as pd
+import plotly
+import plotly.io as pio
+
+
+def run_server(app, port=8050):
+    """
+    启动服务：默认由 gunicorn 多进程 (gthread) 承载 app.server，不同会话的回调可并行执行；
+    无 gunicorn 的环境（如 Windows）回退到多线程开发服务器。设置 DASH_DEBUG=1 进入调试模式
+    """
+    if os.environ.get('DASH_DEBUG') == '1':
+        app.run(debug=True, port=port, use_reloader=False)
+        return
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        app.run(debug=False, port=port, threaded=True)
+        return
+
+    class _DashApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'127.0.0.1:{port}')
+            self.cfg.set('workers', min(4, os.cpu_count() or 1))
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('threads', 4)
+
+        def load(self):
+            return app.server
+
+    _DashApplication().run()
+
+
+# 缓存放在用户自己的目录（权限 0700），不与其他用户共享系统临时目录
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "plotly_dash")
+
+
+def cache_path(prefix, suffix, *sources):
+    """
+    根据各源文件（数据文件、生成缓存的脚本）的修改时间/大小及 plotly 版本生成缓存路径，
+    任一文件变化或升级 plotly 后即失效
+    """
+    stamp = "-".join([plotly.__version__] + [f"{os.path.getmtime(p)}-{os.path.getsize(p)}" for p in sources])
+    key = hashlib.md5(stamp.encode()).hexdigest()
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+    except OSError:
+        pass  # 目录无法创建时写缓存会静默失败，等同于不使用缓存
+    return os.path.join(CACHE_DIR, f"{prefix}_{key}{suffix}")
+
+
+def write_atomic(path, write):
+    """
+    先由 write(tmp_path) 写临时文件再原子替换，避免多个 Worker 读到写了一半的缓存；
+    临时文件由 mkstemp 以随机名称独占创建，写入失败时删除，且不影响主流程
+    """
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                        dir=os.path.dirname(path))
+    except OSError:
+        return
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except (OSError, ValueError, TypeError):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def load_or_build_parquet(prefix, sources, build):
+    """
+    源文件未变化时直接读取 Parquet 缓存，否则调用 build() 生成 DataFrame 并写入缓存
+    返回 (df, 是否命中缓存)
+    """
+    path = cache_path(prefix, ".parquet", *sources)
+    if os.path.exists(path):
+        try:
+            return pd.read_parquet(path), True
+        except (OSError, ValueError):
+            pass  # 缓存不可读或已损坏时重新生成
+    df = build()
+    write_atomic(path, lambda tmp_path: df.to_parquet(tmp_path, compression='snappy'))
+    return df, False
+
+
+def figure_to_prejson(fig):
+    """
+    预先序列化图表：缓存中只保存 UTF-8 编码的 JSON 字节串，回调返回前再用 orjson 解析
+    """
+    return pio.to_json(fig, validate=False).encode()
@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 import numpy as np
@@ -11,12 +13,37 @@ COLOR_MAIN_LINE = '#3C2F80'  # 深靛蓝 - 用于主线条
 COLOR_ACCENT = '#26B6C6'  # 青色 - 用于强调点
 
 
-# 辅助函数：将Hex颜色转为RGBA，用于精准控制透明度
+# 辅助函数：将Hex颜色转为RGBA，用于精准控制透明度（调色板很小，结果直接缓存）
+@lru_cache(maxsize=32)
 def adjust_alpha(hex_color, alpha):
     rgb = mcolors.hex2color(hex_color)
     return (*rgb, alpha)
 
 
+# 辅助函数：纯NumPy波峰检测，与 scipy.signal.find_peaks(y, distance=...) 结果一致
+# （平台峰取中点、首尾点不算峰，同 scipy）；小样本下省去导入scipy的冷启动开销
+def find_peaks_np(y, distance=1):
+    y = np.asarray(y)
+    # 少于3个点时不存在两侧都有邻点的位置
+    if len(y) < 3:
+        return np.array([], dtype=np.intp)
+    # 把连续相等的值合并为"段"，两侧段都更低的段即为波峰，位置取段的中点
+    starts = np.flatnonzero(np.r_[True, y[1:] != y[:-1]])
+    ends = np.r_[starts[1:], len(y)] - 1
+    v = y[starts]
+    is_peak = np.zeros(len(starts), dtype=bool)
+    is_peak[1:-1] = (v[1:-1] > v[:-2]) & (v[1:-1] > v[2:])
+    peaks = (starts[is_peak] + ends[is_peak]) // 2
+
+    # 按峰高从大到小保留，剔除距离更高峰不足distance的次峰
+    keep = np.ones(len(peaks), dtype=bool)
+    for idx in np.argsort(y[peaks])[::-1]:
+        if keep[idx]:
+            keep &= np.abs(peaks - peaks[idx]) >= distance
+            keep[idx] = True
+    return peaks[keep]
+
+
 def setup_fonts():
     plt.rcParams.update({
         "font.family": "serif",
@@ -78,8 +105,7 @@ def plot_refined_elegant_line(x, y, title, xlabel, ylabel, output_filename=None)
 
     # E. 关键点标记 (仿照参考图的圆点)
     # 找出所有的波峰
-    from scipy.signal import find_peaks
-    peaks, _ = find_peaks(y, distance=10)  # distance防止点太密
+    peaks = find_peaks_np(y, distance=10)  # distance防止点太密
 
     # 只标出显著的峰值（例如大于某个阈值）
     significant_peaks = peaks[y[peaks] > 0.5]
@@ -1,10 +1,14 @@
 import os
+from functools import lru_cache
+
 import pandas as pd
-import plotly.express as px
+import orjson
 import plotly.graph_objects as go
 from dash import Dash, dcc, html, Input, Output
 import numpy as np
 
+from dash_common import run_server, load_or_build_parquet, figure_to_prejson
+
 
 # ==============================================================================
 # 1. 配置中心 (Configuration) - 单一事实来源
@@ -51,29 +55,11 @@ class EarthquakeDataLoader:
         读取并清洗数据，处理混合的时间格式
         """
         try:
-            # 1. 读取数据
-            print(f"正在读取数据: {self.file_path} ...")
-            df = pd.read_csv(self.file_path)
-
-            # 2. 时间格式标准化 (处理混合格式)
-            # 数据中包含 '01/02/1965' 和 '1975-02-23T02:58:41.000Z'
-            # 使用 errors='coerce' 将无法解析的转为 NaT，然后清洗
-            df['Datetime'] = pd.to_datetime(df['Date'], utc=True, errors='coerce')
-
-            # 3. 剔除无效时间数据
-            initial_count = len(df)
-            df = df.dropna(subset=['Datetime'])
-            if len(df) < initial_count:
-                print(f"警告: 剔除了 {initial_count - len(df)} 条时间格式错误的记录。")
-
-            # 4. 特征提取：提取年份用于Dash的时间轴滑块
-            df['Year'] = df['Datetime'].dt.year
-
-            # 5. 排序
-            df = df.sort_values(by='Datetime')
-
+            # 数据与清洗逻辑均未变化时直接读取缓存，跳过 CSV 解析与日期清洗
+            df, cached = load_or_build_parquet("earthquake_clean", (self.file_path, __file__), self._read_and_clean)
+            if cached:
+                print("已从缓存加载清洗后的数据。")
             self.clean_data = df
-            print("数据清洗完成。")
             return df
 
         except FileNotFoundError:
@@ -81,10 +67,59 @@ class EarthquakeDataLoader:
         except Exception as e:
             raise RuntimeError(f"数据处理过程中发生未知错误: {e}")
 
+    def _read_and_clean(self):
+        """
+        读取 CSV 并完成清洗，生成写入缓存的 DataFrame
+        """
+        # 1. 读取数据
+        print(f"正在读取数据: {self.file_path} ...")
+        df = pd.read_csv(self.file_path)
+
+        # 2. 时间格式标准化 (处理混合格式)
+        # 数据中包含 '01/02/1965' 和 '1975-02-23T02:58:41.000Z'
+        # 两种格式各走一次向量化解析，再用ISO结果补齐；仍无法解析的转为 NaT，然后清洗
+        dt_us = pd.to_datetime(df['Date'], format='%m/%d/%Y', utc=True, errors='coerce')
+        dt_iso = pd.to_datetime(df['Date'], format='ISO8601', utc=True, errors='coerce')
+        df['Datetime'] = dt_us.fillna(dt_iso)
+
+        # 3. 剔除无效时间数据
+        initial_count = len(df)
+        df = df.dropna(subset=['Datetime'])
+        if len(df) < initial_count:
+            print(f"警告: 剔除了 {initial_count - len(df)} 条时间格式错误的记录。")
+
+        # 4. 特征提取：提取年份用于Dash的时间轴滑块
+        df['Year'] = df['Datetime'].dt.year.astype(np.int16)  # int16 足以表示年份，筛选时带宽更小
+
+        # 5. 排序
+        df = df.sort_values(by='Datetime')
+
+        # 6. 紧凑类型：数值列降为float32，重复字符串列转为category
+        for col in ['Latitude', 'Longitude', 'Depth', 'Magnitude']:
+            if col in df:
+                df[col] = pd.to_numeric(df[col], downcast='float')
+        for col in ['Type', 'Source', 'Magnitude Type']:
+            if col in df:
+                df[col] = df[col].astype('category')
+
+        print("数据清洗完成。")
+        return df
+
 
 # ==============================================================================
 # 3. 视觉构建器 (Visual Architect) - 封装绘图逻辑
 # ==============================================================================
+# 统一主题布局：模块加载时构建一次，各图表直接合并，回调中不再重复构造
+_THEME_LAYOUT = dict(
+    font=dict(family=f"{VisualConfig.FONT_FAMILY_CN}, {VisualConfig.FONT_FAMILY_EN}", size=12,
+              color=VisualConfig.TEXT_COLOR),
+    paper_bgcolor=VisualConfig.CARD_COLOR,
+    plot_bgcolor=VisualConfig.CARD_COLOR,
+    margin=dict(l=20, r=20, t=50, b=20),
+    coloraxis_colorbar=dict(title="震级")
+)
+
+
 class ChartFactory:
     """
     生产符合设计规范的 Plotly 图表对象
@@ -93,32 +128,44 @@ class ChartFactory:
     @staticmethod
     def create_global_map(df):
         """
-        构建全球震级分布地图（使用新版scatter_map）
+        构建全球震级分布地图（scatter_map，MapLibre GL / WebGL 渲染）
         设计意图：使用气泡大小映射震级，颜色映射深度或强度，让视觉重心集中在环太平洋地震带。
         """
         # 自动洞察：找到最大震级
         max_quake = df.loc[df['Magnitude'].idxmax()]
 
-        # 修复：使用新版 scatter_map 替代 scatter_mapbox
-        fig = px.scatter_map(
-            df,
-            lat="Latitude",
-            lon="Longitude",
-            color="Magnitude",
-            size="Magnitude",
-            hover_name="Date",
-            hover_data=["Magnitude", "Latitude", "Longitude"],
-            color_continuous_scale=VisualConfig.COLOR_SCALE,
-            size_max=15,  # 控制最大气泡尺寸，防止遮挡
-            zoom=1,
-            map_style=VisualConfig.MAP_STYLE,
+        # 直接构建 go.Scattermap：坐标与震级一次性转为 float32 数组，
+        # 跳过 plotly.express 逐次调用时的 DataFrame 整理开销
+        lat_lon = df[['Latitude', 'Longitude']].to_numpy(dtype=np.float32)
+        magnitude = df['Magnitude'].to_numpy(dtype=np.float32)
+        size_max = 15  # 控制最大气泡尺寸，防止遮挡
+
+        fig = go.Figure(go.Scattermap(
+            lat=lat_lon[:, 0],
+            lon=lat_lon[:, 1],
+            mode='markers',
+            marker=dict(
+                color=magnitude,
+                coloraxis='coloraxis',
+                size=magnitude,
+                sizemode='area',
+                sizeref=magnitude.max() / size_max ** 2
+            ),
+            hovertext=df['Date'].to_numpy(),
+            hovertemplate="<b>%{hovertext}</b><br><br>Magnitude=%{marker.color:.2~f}"
+                          "<br>Latitude=%{lat:.4~f}<br>Longitude=%{lon:.4~f}<extra></extra>",
+            showlegend=False
+        ))
+        fig.update_layout(
+            map=dict(style=VisualConfig.MAP_STYLE, zoom=1),
+            coloraxis=dict(colorscale=VisualConfig.COLOR_SCALE),
             title=f"全球地震震级分布 ({df['Year'].min()}-{df['Year'].max()})"
         )
 
         # 注入自动洞察：标注最大地震
         fig.add_annotation(
             x=0.5, y=0.95,  # 相对坐标
-            text=f"历史最强震级: {max_quake['Magnitude']} (年份: {max_quake['Year']})",
+            text=f"历史最强震级: {round(float(max_quake['Magnitude']), 2)} (年份: {max_quake['Year']})",
             showarrow=False,
             font=dict(family=VisualConfig.FONT_FAMILY_CN, size=14, color="#C0392B"),
             bgcolor="rgba(255,255,255,0.8)",
@@ -130,21 +177,23 @@ class ChartFactory:
         return fig
 
     @staticmethod
-    def create_magnitude_hist(df):
+    def create_magnitude_hist(counts, edges, mean_mag):
         """
         构建震级分布直方图
         设计意图：展示地震发生的频率与强度的关系（通常遵循幂律分布）。
+        counts/edges 为服务端预先统计好的频次与分箱边界，浏览器只接收 30 个柱子而非全部震级数据。
         """
-        fig = px.histogram(
-            df,
-            x="Magnitude",
-            nbins=30,
-            title="震级频率分布统计",
-            color_discrete_sequence=["#34495E"]  # 使用稳重的深色
-        )
+        fig = go.Figure(go.Bar(
+            x=(edges[:-1] + edges[1:]) * 0.5,
+            y=counts,
+            width=np.diff(edges),
+            customdata=np.column_stack([edges[:-1], edges[1:]]),
+            hovertemplate="Magnitude=%{customdata[0]:.2f}-%{customdata[1]:.2f}<br>count=%{y}<extra></extra>",
+            marker_color="#34495E"  # 使用稳重的深色
+        ))
+        fig.update_layout(title="震级频率分布统计", bargap=0)
 
         # 添加平均线
-        mean_mag = df['Magnitude'].mean()
         fig.add_vline(x=mean_mag, line_width=2, line_dash="dash", line_color="#E74C3C",
                       annotation_text=f"平均震级: {mean_mag:.2f}")
 
@@ -157,14 +206,7 @@ class ChartFactory:
         """
         统一应用设计规范（字体、背景、边距）
         """
-        fig.update_layout(
-            font=dict(family=f"{VisualConfig.FONT_FAMILY_CN}, {VisualConfig.FONT_FAMILY_EN}", size=12),
-            paper_bgcolor=VisualConfig.CARD_COLOR,
-            plot_bgcolor=VisualConfig.CARD_COLOR,
-            font_color=VisualConfig.TEXT_COLOR,
-            margin=dict(l=20, r=20, t=50, b=20),
-            coloraxis_colorbar=dict(title="震级")
-        )
+        fig.update_layout(_THEME_LAYOUT)
 
 
 # ==============================================================================
@@ -180,6 +222,20 @@ def launch_dashboard(df):
     min_year = int(df['Year'].min())
     max_year = int(df['Year'].max())
 
+    # 按年份稳定排序，并预计算每个年份的起始行位置：年份区间切片即一次整数切片
+    df = df.sort_values('Year', kind='stable').reset_index(drop=True)
+    year_starts = df['Year'].searchsorted(np.arange(min_year, max_year + 2))
+
+    # 震级直方图预计算：全局统一分箱，按 年份 x 分箱 统计频次，回调只需对区间内的年份求和
+    magnitude = df['Magnitude'].to_numpy(dtype=np.float32)
+    mag_edges = np.linspace(magnitude.min(), magnitude.max(), 31)
+    bin_idx = np.clip(np.searchsorted(mag_edges, magnitude, side='right') - 1, 0, len(mag_edges) - 2)
+    year_hist = np.zeros((max_year - min_year + 1, len(mag_edges) - 1), dtype=np.int64)
+    np.add.at(year_hist, (df['Year'].to_numpy() - min_year, bin_idx), 1)
+
+    # 滑块刻度（每5年一个）
+    year_marks = {str(year): str(year) for year in range(min_year, max_year + 1, 5)}
+
     # 布局设计 (采用 CSS Flexbox 思想)
     app.layout = html.Div(
         style={'backgroundColor': VisualConfig.BG_COLOR, 'fontFamily': VisualConfig.FONT_FAMILY_CN, 'padding': '20px'},
@@ -200,7 +256,7 @@ def launch_dashboard(df):
                     min=min_year,
                     max=max_year,
                     value=[min_year, max_year],
-                    marks={str(year): str(year) for year in range(min_year, max_year + 1, 5)},
+                    marks=year_marks,
                     step=1,
                     tooltip={"placement": "bottom", "always_visible": True}
                 ),
@@ -225,39 +281,45 @@ def launch_dashboard(df):
         ])
 
     # --- 回调逻辑 (Interaction Logic) ---
-    @app.callback(
-        [Output('map-graph', 'figure'),
-         Output('hist-graph', 'figure'),
-         Output('stats-card', 'children')],
-        [Input('year-slider', 'value')]
-    )
-    def update_charts(year_range):
-        # 1. 数据切片
-        filtered_df = df[(df['Year'] >= year_range[0]) & (df['Year'] <= year_range[1])]
+    # 同一年份区间的结果直接复用（滑块来回拖动时常见）；全区间一项约 1 MB，条目数从严控制
+    @lru_cache(maxsize=16)
+    def build_outputs(lo, hi):
+        # 1. 数据切片：按预计算的年份起始位置直接切片，无需布尔掩码
+        filtered_df = df.iloc[year_starts[lo - min_year]:year_starts[hi - min_year + 1]]
 
         # 边界情况处理：如果筛选为空
         if filtered_df.empty:
-            return {}, {}, "所选范围内无数据"
+            return b'{}', b'{}', "所选范围内无数据"
 
         # 2. 生成图表
         map_fig = ChartFactory.create_global_map(filtered_df)
-        hist_fig = ChartFactory.create_magnitude_hist(filtered_df)
+        counts = year_hist[lo - min_year:hi - min_year + 1].sum(axis=0)
+        hist_fig = ChartFactory.create_magnitude_hist(counts, mag_edges, filtered_df['Magnitude'].mean())
 
         # 3. 生成统计卡片
         stats_info = [
             html.H4("当前区间统计概要"),
             html.P(f"地震总次数: {len(filtered_df)} 次"),
-            html.P(f"最大震级: {filtered_df['Magnitude'].max()}"),
+            html.P(f"最大震级: {round(float(filtered_df['Magnitude'].max()), 2)}"),
             html.P(f"平均震级: {filtered_df['Magnitude'].mean():.2f}")
         ]
 
-        return map_fig, hist_fig, stats_info
+        return figure_to_prejson(map_fig), figure_to_prejson(hist_fig), stats_info
+
+    @app.callback(
+        [Output('map-graph', 'figure'),
+         Output('hist-graph', 'figure'),
+         Output('stats-card', 'children')],
+        [Input('year-slider', 'value')]
+    )
+    def update_charts(year_range):
+        map_json, hist_json, stats_info = build_outputs(int(year_range[0]), int(year_range[1]))
+        return orjson.loads(map_json), orjson.loads(hist_json), stats_info
 
     print(">>> 系统启动中: 请访问 http://127.0.0.1:8050/ 查看可视化产品")
     print(">>> 如需公网访问，请在终端运行: ngrok http 8050")
 
-    # 修复：使用新版 app.run 替代 app.run_server
-    app.run(debug=True, use_reloader=False)
+    run_server(app)
 
 
 # ==============================================================================
@@ -1,9 +1,15 @@
 import os
+import threading
+from functools import lru_cache
+
 import pandas as pd
+import orjson
 import numpy as np
 import plotly.graph_objects as go
 from dash import Dash, dcc, html, Input, Output
 
+from dash_common import run_server, load_or_build_parquet, figure_to_prejson
+
 
 # ==============================================================================
 # 1. 架构配置 (Configuration)
@@ -28,6 +34,10 @@ class AppConfig:
     BG_COLOR = "#FAEDDA"  # 暖米色
     CARD_COLOR = "#FFFFFF"
 
+    # 降采样：区间内点数超过阈值时用 LTTB 抽取到目标点数
+    DOWNSAMPLE_THRESHOLD = 3000
+    DOWNSAMPLE_POINTS = 2000
+
 
 # ==============================================================================
 # 2. 数据引擎 (Data Engine)
@@ -39,8 +49,8 @@ def load_and_process_data(file_path):
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"错误: 找不到文件 {file_path}")
 
-    # 读取CSV - 根据图片，第一行是表头
-    df = pd.read_csv(file_path)
+    # 读取CSV - 根据图片，第一行是表头（pyarrow 多线程解析）
+    df = pd.read_csv(file_path, engine='pyarrow')
     print(f"✓ 成功加载数据，共 {len(df)} 条记录")
     print(f"✓ 列名: {df.columns.tolist()}")
 
@@ -74,8 +84,11 @@ def clean_data(df):
     else:
         raise ValueError("CSV格式错误：列数少于3列")
 
-    # 3. 转换日期
-    df['Date'] = pd.to_datetime(df['Date'])
+    # 3. 转换日期：优先按显式格式走向量化解析，格式不符时再回退到自动推断
+    try:
+        df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d', cache=True)
+    except (ValueError, TypeError):
+        df['Date'] = pd.to_datetime(df['Date'], cache=True)
 
     # 4. 确保数值列是数字类型
     df['Value'] = pd.to_numeric(df['Value'], errors='coerce')
@@ -85,8 +98,14 @@ def clean_data(df):
     df = df.dropna(subset=['Date', 'Value', 'MA'])
 
     # 6. 核心逻辑：计算用于填充颜色的"上方"和"下方"序列
-    df['Upper_Bound'] = np.maximum(df['Value'], df['MA'])
-    df['Lower_Bound'] = np.minimum(df['Value'], df['MA'])
+    # 数值列降为 float32，上下界直接写入预分配缓冲区，避免中间数组
+    value = df['Value'].to_numpy(dtype=np.float32)
+    ma = df['MA'].to_numpy(dtype=np.float32)
+    upper = np.empty(len(df), dtype=np.float32)
+    lower = np.empty(len(df), dtype=np.float32)
+    np.fmax(value, ma, out=upper)
+    np.fmin(value, ma, out=lower)
+    df = df.assign(Value=value, MA=ma, Upper_Bound=upper, Lower_Bound=lower)
 
     print(f"✓ 数据清洗完成，有效记录: {len(df)} 条")
     print(f"✓ 日期范围: {df['Date'].min()} 至 {df['Date'].max()}")
@@ -94,101 +113,189 @@ def clean_data(df):
     return df.sort_values('Date').reset_index(drop=True)
 
 
-# ==============================================================================
-# 3. 视觉构建工厂 (Chart Factory)
-# ==============================================================================
-def create_financial_chart(df, y_range=None):
+def load_clean_data(file_path):
     """
-    构建差异面积图 (Difference Chart)
+    读取清洗后的数据：数据与清洗逻辑均未变化时直接读取 Parquet 缓存，否则重新清洗并写入缓存
     """
-    fig = go.Figure()
-
-    # 1. 绘制基准线 (移动平均线)
-    fig.add_trace(go.Scatter(
-        x=df['Date'],
-        y=df['MA'],
-        mode='lines',
-        line=dict(color=AppConfig.COLOR_MA_LINE, width=1.5),
-        name='1年移动平均',
-        hoverinfo='skip'
-    ))
-
-    # 2. 绘制"多头"区域 (Price > MA)
-    fig.add_trace(go.Scatter(
-        x=df['Date'],
-        y=df['Upper_Bound'],
-        mode='lines',
-        line=dict(width=0),
-        fill='tonexty',
-        fillcolor=AppConfig.COLOR_BULLISH,
-        name='牛市区域 (高于均线)',
-        hoverinfo='skip'
-    ))
-
-    # 3. 重新绘制MA作为填充基准
-    fig.add_trace(go.Scatter(
-        x=df['Date'],
-        y=df['MA'],
-        mode='lines',
-        line=dict(width=0),
-        showlegend=False,
-        hoverinfo='skip'
-    ))
-
-    # 4. 绘制"空头"区域 (Price < MA)
-    fig.add_trace(go.Scatter(
-        x=df['Date'],
-        y=df['Lower_Bound'],
-        mode='lines',
-        line=dict(width=0),
-        fill='tonexty',
-        fillcolor=AppConfig.COLOR_BEARISH,
-        name='熊市区域 (低于均线)',
-        hoverinfo='skip'
-    ))
-
-    # 5. 绘制实际价格线 (覆盖在最上层)
-    fig.add_trace(go.Scatter(
-        x=df['Date'],
-        y=df['Value'],
-        mode='lines',
-        line=dict(color=AppConfig.COLOR_PRICE_LINE, width=1),
-        name='道琼斯指数'
-    ))
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"错误: 找不到文件 {file_path}")
 
-    # 6. 美学修饰
-    fig.update_layout(
-        title="<b>道琼斯工业平均指数：市场情绪分析</b><br>" +
-              "<span style='font-size:12px;color:grey'>与1年移动平均线的差异对比</span>",
-        title_font=dict(family=AppConfig.FONT_FAMILY, size=20, color="#2C3E50"),
-        paper_bgcolor=AppConfig.CARD_COLOR,
-        plot_bgcolor=AppConfig.CARD_COLOR,
-        font=dict(family=AppConfig.FONT_FAMILY),
-        margin=dict(l=60, r=40, t=80, b=40),
-        xaxis=dict(
-            showgrid=True,
-            gridcolor="#F0F0F0",
-            title="日期"
+    df, cached = load_or_build_parquet(
+        "djia_clean", (file_path, __file__), lambda: clean_data(load_and_process_data(file_path))
+    )
+    if cached:
+        print(f"✓ 已从缓存加载清洗后的数据，共 {len(df)} 条记录")
+    return df
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets 降采样，返回被保留点的下标（含首尾点）
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # 中间 n-2 个点均分为 n_out-2 个桶；每个桶的"下一桶均值"可一次性算出
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    counts = np.diff(edges)
+    next_x = np.append(np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts, x[-1])[1:]
+    next_y = np.append(np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts, y[-1])[1:]
+
+    idx = np.empty(n_out, dtype=np.intp)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # 与上一个选中点、下一桶均值构成的三角形面积（省略 1/2）
+        area = np.abs((x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a]))
+        a = lo + int(area.argmax())
+        idx[i + 1] = a
+
+    return idx
+
+
+# ==============================================================================
+# 3. 视觉构建工厂 (Chart Factory)
+# ==============================================================================
+# 差异图的固定布局：模块加载时构建一次，回调中只叠加动态的 Y 轴范围
+_FIN_BASE_LAYOUT = dict(
+    title="<b>道琼斯工业平均指数：市场情绪分析</b><br>" +
+          "<span style='font-size:12px;color:grey'>与1年移动平均线的差异对比</span>",
+    title_font=dict(family=AppConfig.FONT_FAMILY, size=20, color="#2C3E50"),
+    paper_bgcolor=AppConfig.CARD_COLOR,
+    plot_bgcolor=AppConfig.CARD_COLOR,
+    font=dict(family=AppConfig.FONT_FAMILY),
+    margin=dict(l=60, r=40, t=80, b=40),
+    xaxis=dict(
+        type="date",  # x 为毫秒时间戳，显式声明为日期轴
+        showgrid=True,
+        gridcolor="#F0F0F0",
+        title="日期"
+    ),
+    yaxis=dict(
+        showgrid=True,
+        gridcolor="#F0F0F0",
+        title="指数点位",
+        zeroline=False
+    ),
+    legend=dict(
+        orientation="h",
+        yanchor="bottom",
+        y=1.02,
+        xanchor="right",
+        x=1
+    ),
+    hovermode="x unified"
+)
+
+
+# 差异图的轨迹结构固定：模块加载时只构建（并校验）一次，每次回调只替换数据数组
+# 轨迹顺序即填充顺序：上界 -> MA(向上界填充"多头"区域) -> 下界(向MA填充"空头"区域)，
+# 这样 MA 本身就是两块区域的公共基准，无需再重复绘制一条 MA；
+# "空头"区域由下界独占，可在图例中单独隐藏，不影响其余轨迹
+_FIN_FIG = go.Figure(
+    data=[
+        # 1. "多头"区域的上边界 (Price > MA 时即价格)
+        go.Scattergl(
+            mode='lines',
+            line=dict(width=0),
+            showlegend=False,
+            hoverinfo='skip'
         ),
-        yaxis=dict(
-            showgrid=True,
-            gridcolor="#F0F0F0",
-            title="指数点位",
-            zeroline=False
+        # 2. 绘制基准线 (移动平均线)，同时填充"多头"区域
+        go.Scattergl(
+            mode='lines',
+            line=dict(color=AppConfig.COLOR_MA_LINE, width=1.5),
+            fill='tonexty',
+            fillcolor=AppConfig.COLOR_BULLISH,
+            name='1年移动平均',
+            legendgroup='ma',
+            legendrank=1,
+            hoverinfo='skip'
         ),
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
+        # 3. 绘制"空头"区域 (Price < MA)
+        go.Scattergl(
+            mode='lines',
+            line=dict(width=0),
+            fill='tonexty',
+            fillcolor=AppConfig.COLOR_BEARISH,
+            name='熊市区域 (低于均线)',
+            legendrank=3,
+            hoverinfo='skip'
         ),
-        hovermode="x unified"
-    )
+        # 4. "多头"区域的图例项（单个空点，仅用于图例说明；与 MA 同组，
+        #    点击时与其填充一同显示/隐藏）。放在下界之后，不充当任何填充的基准
+        go.Scattergl(
+            x=[None],
+            y=[None],
+            mode='lines',
+            line=dict(width=0),
+            fill='tonexty',
+            fillcolor=AppConfig.COLOR_BULLISH,
+            name='牛市区域 (高于均线)',
+            legendgroup='ma',
+            legendrank=2,
+            hoverinfo='skip'
+        ),
+        # 5. 绘制实际价格线 (覆盖在最上层)
+        go.Scattergl(
+            mode='lines',
+            line=dict(color=AppConfig.COLOR_PRICE_LINE, width=1),
+            name='道琼斯指数',
+            legendrank=4,
+            yhoverformat=',.2f'  # float32数据按两位小数显示
+        ),
+    ],
+    # 6. 美学修饰
+    layout=_FIN_BASE_LAYOUT
+)
+# 共享图表对象的改写与序列化需成对进行，多线程服务器下用锁保护
+_FIN_FIG_LOCK = threading.Lock()
+
+
+def prepare_chart_arrays(df):
+    """
+    准备差异面积图的数据数组，返回 (dates, (上界, MA, 下界, 价格))
+    不涉及共享 Figure，可在锁外执行
+    """
+    # 一次性转为类型化数组：日期转为毫秒时间戳(float64)，数值为float32；
+    # plotly 会以 base64 typed array 传输，而不是逐点的日期字符串 / JSON 数字
+    dates = df['Date'].to_numpy(dtype='datetime64[ms]').astype(np.int64).astype(np.float64)
+    y_ma = df['MA'].to_numpy(dtype=np.float32)
+    y_upper = df['Upper_Bound'].to_numpy(dtype=np.float32)
+    y_lower = df['Lower_Bound'].to_numpy(dtype=np.float32)
+    y_value = df['Value'].to_numpy(dtype=np.float32)
+
+    # 点数过多时按价格序列做 LTTB 抽样，所有轨迹共用同一组下标以保持填充区域对齐
+    if len(dates) > AppConfig.DOWNSAMPLE_THRESHOLD:
+        keep = lttb_indices(dates, y_value, AppConfig.DOWNSAMPLE_POINTS)
+        dates, y_ma, y_upper, y_lower, y_value = (a[keep] for a in (dates, y_ma, y_upper, y_lower, y_value))
+
+    return dates, (y_upper, y_ma, y_lower, y_value)
 
-    # 7. 响应 Y 轴控制
-    if y_range and len(y_range) == 2 and y_range[0] < y_range[1]:
-        fig.update_layout(yaxis_range=y_range)
+
+def create_financial_chart(arrays, y_range=None):
+    """
+    构建差异面积图 (Difference Chart)：把 prepare_chart_arrays 的结果写入共享 Figure
+    注意：返回的是模块级共享的 Figure，调用方应在持有 _FIN_FIG_LOCK 时使用完毕
+    """
+    dates, ys = arrays
+    fig = _FIN_FIG
+    with fig.batch_update():
+        # 第 4 条为仅图例的轨迹，不写入数据
+        for trace, y in zip(fig.data[:3] + fig.data[4:], ys):
+            trace.x = dates
+            trace.y = y
+
+        # 7. 响应 Y 轴控制（无效范围时清除上一次的设置）
+        if y_range and len(y_range) == 2 and y_range[0] < y_range[1]:
+            fig.layout.yaxis.range = y_range
+        else:
+            fig.layout.yaxis.range = None
 
     return fig
 
@@ -205,6 +312,11 @@ def create_app(df):
     min_date = df['Date'].min()
     max_date = df['Date'].max()
 
+    # 滑块刻度：一次向量化解析得到各年份1月1日的时间戳，替代逐年构造 pd.Timestamp
+    mark_years = np.arange(min_date.year, max_date.year + 2)
+    mark_ts = pd.to_datetime(mark_years.astype(str), format='%Y').values.astype('datetime64[s]').astype(np.int64)
+    date_marks = dict(zip(mark_ts.tolist(), mark_years.astype(str).tolist()))
+
     app.layout = html.Div(style={
         'backgroundColor': AppConfig.BG_COLOR,
         'minHeight': '100vh',
@@ -268,10 +380,7 @@ def create_app(df):
                     min=min_date.timestamp(),
                     max=max_date.timestamp(),
                     value=[min_date.timestamp(), max_date.timestamp()],
-                    marks={
-                        int(pd.Timestamp(f"{year}-01-01").timestamp()): str(year)
-                        for year in range(min_date.year, max_date.year + 2)
-                    },
+                    marks=date_marks,
                     step=24 * 60 * 60  # 1天步长
                 )
             ])
@@ -279,13 +388,9 @@ def create_app(df):
     ])
 
     # --- 回调逻辑 ---
-    @app.callback(
-        Output('main-chart', 'figure'),
-        [Input('date-slider', 'value'),
-         Input('y-min', 'value'),
-         Input('y-max', 'value')]
-    )
-    def update_chart(date_range_timestamps, y_min, y_max):
+    # 相同输入直接返回已序列化的图表
+    @lru_cache(maxsize=64)
+    def build_chart(date_range_timestamps, y_min, y_max):
         # 1. 解析时间范围
         start_date = pd.Timestamp.fromtimestamp(date_range_timestamps[0])
         end_date = pd.Timestamp.fromtimestamp(date_range_timestamps[1])
@@ -299,8 +404,19 @@ def create_app(df):
         if y_min is not None and y_max is not None and y_min < y_max:
             y_range = [y_min, y_max]
 
-        # 4. 生成图表
-        return create_financial_chart(df_filtered, y_range)
+        # 4. 生成图表：数组转换与抽样在锁外完成，只有写入共享 Figure 与序列化需要持锁
+        arrays = prepare_chart_arrays(df_filtered)
+        with _FIN_FIG_LOCK:
+            return figure_to_prejson(create_financial_chart(arrays, y_range))
+
+    @app.callback(
+        Output('main-chart', 'figure'),
+        [Input('date-slider', 'value'),
+         Input('y-min', 'value'),
+         Input('y-max', 'value')]
+    )
+    def update_chart(date_range_timestamps, y_min, y_max):
+        return orjson.loads(build_chart(tuple(date_range_timestamps), y_min, y_max))
 
     return app
 
@@ -314,13 +430,9 @@ if __name__ == '__main__':
     print("=" * 70)
 
     try:
-        # 1. 加载数据
-        print("\n[步骤 1/3] 加载数据...")
-        raw_df = load_and_process_data(AppConfig.DATA_PATH)
-
-        # 2. 清洗数据
-        print("\n[步骤 2/3] 清洗数据...")
-        clean_df = clean_data(raw_df)
+        # 1-2. 加载并清洗数据（命中缓存时跳过 CSV 解析与清洗）
+        print("\n[步骤 1-2/3] 加载并清洗数据...")
+        clean_df = load_clean_data(AppConfig.DATA_PATH)
 
         # 3. 启动应用
         print("\n[步骤 3/3] 启动Web应用...")
@@ -334,8 +446,7 @@ if __name__ == '__main__':
         print("\n   按 Ctrl+C 停止服务器")
         print("=" * 70 + "\n")
 
-        # 修复：使用 app.run 替代 app.run_server
-        app.run(debug=True, use_reloader=False)
+        run_server(app)
 
     except FileNotFoundError as e:
         print(f"\n❌ 文件错误: {e}")
@@ -1,5 +1,5 @@
 import dash
-from dash import dcc, html, Input, Output, callback
+from dash import dcc, html, Input, Output, State
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
 import numpy as np
@@ -47,10 +47,34 @@ app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 # ==========================================
 # 3. 核心逻辑 (Simulation Logic)
 # ==========================================
+# 时间轴固定不变，只生成一次
+SIM_T = np.linspace(0, 10, 500)
+
+
 def generate_simulation_data(amplitude, frequency, decay):
-    t = np.linspace(0, 10, 500)
-    y = amplitude * np.exp(-decay * t) * np.cos(frequency * t)
-    return t, y
+    # y = A * exp(-λt) * cos(ωt)，原地计算，仅分配结果数组与一个临时数组
+    y = np.multiply(SIM_T, -decay)
+    np.exp(y, out=y)
+    cos_term = np.multiply(SIM_T, frequency)
+    np.cos(cos_term, out=cos_term)
+    y *= cos_term
+    y *= amplitude
+    return SIM_T, y
+
+
+def build_figure(amp, freq, decay):
+    t, y = generate_simulation_data(amp, freq, decay)
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=t, y=y, mode='lines', line=dict(color=COLOR_MAIN, width=2), fill='tozeroy',
+                             fillcolor='rgba(60, 47, 128, 0.1)'))
+    fig.update_layout(
+        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(255,255,255,0.5)',
+        font=dict(family=FONT_PRIMARY, color=COLOR_MAIN),
+        margin=dict(l=40, r=40, t=40, b=40),
+        xaxis=dict(showgrid=True, gridcolor='rgba(0,0,0,0.1)', tickfont=dict(family=FONT_FUNC)),
+        yaxis=dict(showgrid=True, gridcolor='rgba(0,0,0,0.1)', tickfont=dict(family=FONT_FUNC))
+    )
+    return fig
 
 
 # ==========================================
@@ -77,7 +101,8 @@ app.layout = dbc.Container([
             ], style={'background-color': 'white', 'padding': '20px', 'border-radius': '10px'})
         ], width=4),
         dbc.Col([
-            dcc.Graph(id='main-graph', style={'height': '600px'})
+            # 初始图表由服务端生成一次（与滑块默认值一致），之后的更新全部在浏览器端完成
+            dcc.Graph(id='main-graph', figure=build_figure(5, 10, 0.2), style={'height': '600px'})
         ], width=8)
     ])
 ], fluid=True, style={'background-color': COLOR_BG, 'min-height': '100vh', 'padding': '20px'})
@@ -86,23 +111,28 @@ app.layout = dbc.Container([
 # ==========================================
 # 5. 回调 (Callbacks)
 # ==========================================
-@callback(
+# 客户端回调：拖动滑块时直接在浏览器中重算曲线，只替换轨迹数据、沿用服务端生成的样式
+# 采样点与 SIM_T 保持一致：[0, 10] 区间 500 个点
+app.clientside_callback(
+    """
+    function(A, f, d, fig) {
+        const n = 500;
+        const x = new Float32Array(n);
+        const y = new Float32Array(n);
+        for (let i = 0; i < n; i++) {
+            const t = 10 * i / (n - 1);
+            x[i] = t;
+            y[i] = A * Math.exp(-d * t) * Math.cos(f * t);
+        }
+        const trace = Object.assign({}, fig.data[0], {x: x, y: y});
+        return Object.assign({}, fig, {data: [trace]});
+    }
+    """,
     Output('main-graph', 'figure'),
-    [Input('slider-amp', 'value'), Input('slider-freq', 'value'), Input('slider-decay', 'value')]
+    [Input('slider-amp', 'value'), Input('slider-freq', 'value'), Input('slider-decay', 'value')],
+    State('main-graph', 'figure'),
+    prevent_initial_call=True
 )
-def update_graph(amp, freq, decay):
-    t, y = generate_simulation_data(amp, freq, decay)
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=t, y=y, mode='lines', line=dict(color=COLOR_MAIN, width=2), fill='tozeroy',
-                             fillcolor='rgba(60, 47, 128, 0.1)'))
-    fig.update_layout(
-        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(255,255,255,0.5)',
-        font=dict(family=FONT_PRIMARY, color=COLOR_MAIN),
-        margin=dict(l=40, r=40, t=40, b=40),
-        xaxis=dict(showgrid=True, gridcolor='rgba(0,0,0,0.1)', tickfont=dict(family=FONT_FUNC)),
-        yaxis=dict(showgrid=True, gridcolor='rgba(0,0,0,0.1)', tickfont=dict(family=FONT_FUNC))
-    )
-    return fig
 
 
 # ==========================================